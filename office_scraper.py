@@ -1,31 +1,242 @@
 import asyncio
-import json
+import contextlib
+import functools
+import hashlib
+import io
+import multiprocessing
 import re
-import tempfile
 import os
-import requests
+import tempfile
+import threading
+import zipfile
+import aiohttp
+import diskcache
+import orjson
+import zstandard
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.dammit import EncodingDetector
+from selectolax.lexbor import LexborHTMLParser
 from pathlib import Path
 from playwright.async_api import async_playwright
 import fitz  # PyMuPDF
+from lxml import etree
+
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
+# Browser identity and headers shared by the search browser and every HTTP request;
+# brotli/gzip bodies are decoded transparently by aiohttp
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36"
+HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept-Encoding": "gzip, deflate, br",
+}
+
+# Search APIs, tried before the headless browser: Google Programmable Search
+# when both the key and engine ID are set, otherwise a SearXNG instance
+GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
+GOOGLE_CSE_ID = os.environ.get("GOOGLE_CSE_ID")
+SEARXNG_URL = os.environ.get("SEARXNG_URL")
+
+# The Custom Search API rejects any request whose start + num exceeds 100
+GOOGLE_API_RESULT_LIMIT = 100
+
+# On-disk cache of extracted text, reused across runs: documents are keyed by
+# URL plus ETag/Last-Modified, HTML pages by a hash of their body
+CACHE_DIR = os.environ.get("SCRAPER_CACHE_DIR", ".scraper_cache")
+
+# Per-connect and per-read timeouts, like requests' timeout=; there is no total
+# limit so large documents and waits for a free connection never time out
+PAGE_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=15)
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=30)
+
+# OOXML namespaces for the office document parts we read
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+DRAWING_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+PRESENTATION_NS = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Parser for untrusted office document parts: external entities are never
+# expanded, so a downloaded file cannot pull local files into the output
+XML_PARSER = etree.XMLParser(resolve_entities=False, no_network=True)
+
+# Line breaks and tabs inside runs, which carry no text node of their own
+WORD_BREAKS = {WORD_NS + "br": "\n", WORD_NS + "cr": "\n", WORD_NS + "tab": "\t"}
+DRAWING_BREAKS = {DRAWING_NS + "br": "\n"}
+
+# Column letters of a cell reference such as "AB12"
+CELL_COLUMN_RE = re.compile(r"[A-Z]+")
+
+# URLs, email addresses, None values and very long words (likely garbage)
+CLEAN_RE = re.compile(r'https?://\S+|\S+@\S+\.\S+|None|\S{50,}')
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Absolute URLs (scheme and host), and links to documents we know how to extract
+URL_RE = re.compile(r'^[a-zA-Z][\w+.\-]*://[^/\s?#]+')
+DOWNLOAD_RE = re.compile(r'\.(pdf|txt|docx?|xlsx?|pptx?)(?:[?#]|$)', re.IGNORECASE)
+
+# Worker processes used to extract PDF text, and the minimum number of pages
+# each worker should get before splitting one document across them is worthwhile
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))
+PDF_PAGES_PER_WORKER = 8
+
+# HTML bytes read per page; text beyond this point of a huge page is not worth the transfer
+HTML_MAX_BYTES = 256 * 1024
+
+# Documents up to this size are parsed from memory; larger ones spill to a temp file
+DOWNLOAD_SPOOL_LIMIT = 8 * 1024 * 1024
+
+# Plain text extraction options: clean_text collapses whitespace anyway, so
+# only clipping to the page box is kept and ligature/whitespace handling is off
+PDF_TEXT_FLAGS = fitz.TEXT_MEDIABOX_CLIP
+
+# URLs processed at once, overall and against any single host
+MAX_CONCURRENT_URLS = 16
+MAX_CONCURRENT_URLS_PER_HOST = 2
+
+# Elements kept by the BeautifulSoup fallback parser; everything in <head> is skipped
+SOUP_STRAINER = SoupStrainer(["body", "main", "article", "p", "h1", "h2", "h3", "h4", "li", "td", "a"])
+
+# Resource types aborted while loading search results; only the document is needed
+BLOCKED_RESOURCE_TYPES = {"image", "stylesheet", "font", "media"}
+
+# Shared Playwright browser, launched on the first search and reused afterwards.
+# Playwright objects are bound to the event loop that created them, so the browser
+# lives on its own loop thread and never dies with (or leaks from) a caller's loop
+playwright_instance = None
+browser_instance = None
+browser_loop = None
+browser_thread = None
+browser_lock = None
+browser_thread_lock = threading.Lock()
+
+# Shared pool of PDF worker processes, started on the first PDF
+pdf_pool = None
+
+
+def get_browser_loop():
+    """Return the event loop that owns the shared browser, starting its thread on first use."""
+    global browser_loop, browser_thread
+    
+    with browser_thread_lock:
+        if browser_loop is None:
+            browser_loop = asyncio.new_event_loop()
+            browser_thread = threading.Thread(target=browser_loop.run_forever, name="playwright", daemon=True)
+            browser_thread.start()
+    return browser_loop
+
+
+async def in_browser_loop(coro):
+    """Run a coroutine on the browser's event loop and wait for it from the calling loop."""
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, get_browser_loop()))
+
+
+async def get_browser():
+    """Return the shared headless Chromium, launching it on first use; runs on the browser loop."""
+    global playwright_instance, browser_instance, browser_lock
+    
+    if browser_lock is None:
+        browser_lock = asyncio.Lock()
+    
+    async with browser_lock:
+        if browser_instance is None or not browser_instance.is_connected():
+            if playwright_instance is None:
+                playwright_instance = await async_playwright().start()
+            browser_instance = await playwright_instance.chromium.launch(headless=True)
+    return browser_instance
 
-# Office document libraries
-import docx
-import openpyxl
-from pptx import Presentation
+
+async def stop_browser():
+    """Close the shared browser and stop the Playwright driver; runs on the browser loop."""
+    global playwright_instance, browser_instance
+    
+    if browser_instance is not None:
+        await browser_instance.close()
+        browser_instance = None
+    if playwright_instance is not None:
+        await playwright_instance.stop()
+        playwright_instance = None
+
+
+async def close_browser():
+    """Shut down the shared browser, Playwright driver and browser loop thread, if running."""
+    global browser_loop, browser_thread, browser_lock
+    
+    with browser_thread_lock:
+        loop, thread = browser_loop, browser_thread
+        browser_loop = browser_thread = browser_lock = None
+    if loop is None:
+        return
+    
+    try:
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(stop_browser(), loop))
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        await asyncio.get_running_loop().run_in_executor(None, thread.join)
+        loop.close()
+
+
+def get_pdf_pool():
+    """Return the shared PDF worker process pool, starting it on first use."""
+    global pdf_pool
+    
+    # PyMuPDF runs MuPDF without locks, so it must never be called from two
+    # threads at once; every fitz call goes to single-threaded worker processes
+    if pdf_pool is None:
+        pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return pdf_pool
+
+
+def discard_pdf_pool(pool):
+    """Drop a broken PDF worker pool so the next PDF starts a fresh one."""
+    global pdf_pool
+    
+    if pdf_pool is pool:
+        pdf_pool = None
+    pool.shutdown(wait=False)
+
+
+def shutdown_pdf_pool():
+    """Stop the PDF worker processes, if running."""
+    global pdf_pool
+    
+    if pdf_pool is not None:
+        pdf_pool.shutdown()
+        pdf_pool = None
+
+
+async def block_heavy_resources(route):
+    """Abort requests for images, stylesheets, fonts and media."""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
 
 
 async def google_search(query, num_results=10):
     """Perform a Google search and return a list of result URLs."""
+    return await in_browser_loop(browse_google(query, num_results))
+
+
+async def browse_google(query, num_results=10):
+    """Scrape Google's result page with the shared browser; runs on the browser loop."""
     urls = []
     print(f"Searching Google for: {query}")
     
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36"
-        )
+    browser = await get_browser()
+    context = await browser.new_context(
+        user_agent=USER_AGENT
+    )
+    try:
+        await context.route("**/*", block_heavy_resources)
         page = await context.new_page()
 
         # Navigate to Google and perform search
@@ -34,11 +245,10 @@ async def google_search(query, num_results=10):
         # Wait for search results to load
         await page.wait_for_selector("div#search", timeout=10000)
         
-        # Extract result links
-        result_links = await page.query_selector_all("div.g a[href^='http']")
+        # Extract result links (result titles are <h3> inside the link) in one round trip
+        result_links = await page.eval_on_selector_all("a:has(h3)", "els => els.map(e => e.href)")
         
-        for link in result_links:
-            href = await link.get_attribute("href")
+        for href in result_links:
             if href and href.startswith("http"):
                 # Filter out Google's own domains
                 parsed_url = urlparse(href)
@@ -51,9 +261,10 @@ async def google_search(query, num_results=10):
                 
         # If we didn't get enough results with the first selector, try another common one
         if len(urls) < num_results:
-            elements = await page.query_selector_all("a")
-            for e in elements:
-                href = await e.get_attribute("href")
+            elements = await page.eval_on_selector_all(
+                "a[href^='/url?q=']", "els => els.map(e => e.getAttribute('href'))"
+            )
+            for href in elements:
                 if href and href.startswith("/url?q="):
                     clean_url = href.split("/url?q=")[1].split("&sa=")[0]
                     if not clean_url.startswith("http"):
@@ -66,21 +277,96 @@ async def google_search(query, num_results=10):
                 
                 if len(urls) >= num_results:
                     break
+    finally:
+        await context.close()
+    
+    return list(dict.fromkeys(urls))
+
 
-        await browser.close()
+async def google_search_api(session, query, num_results=10):
+    """Search through the Google Programmable Search JSON API and return result URLs."""
+    urls = []
+    print(f"Searching Google API for: {query}")
     
-    return list(set(urls))
+    # The API returns at most 10 results per request
+    for start in range(1, num_results + 1, 10):
+        num = min(10, num_results - start + 1, GOOGLE_API_RESULT_LIMIT - start)
+        if num <= 0:
+            print(f"Google API returns at most {GOOGLE_API_RESULT_LIMIT - 1} results, stopping there")
+            break
+        
+        params = {
+            "key": GOOGLE_API_KEY,
+            "cx": GOOGLE_CSE_ID,
+            "q": query,
+            "num": num,
+            "start": start,
+        }
+        async with session.get("https://www.googleapis.com/customsearch/v1", params=params) as r:
+            r.raise_for_status()
+            data = await r.json()
+        
+        items = data.get("items", [])
+        for item in items:
+            if item.get("link"):
+                urls.append(item["link"])
+                print(f"Found URL: {item['link']}")
+        
+        if len(items) < params["num"]:
+            break
+    
+    return urls[:num_results]
+
+
+async def searxng_search(session, query, num_results=10):
+    """Search through a SearXNG instance's JSON API and return result URLs."""
+    urls = []
+    print(f"Searching SearXNG for: {query}")
+    
+    page = 1
+    while len(urls) < num_results:
+        params = {"q": query, "format": "json", "pageno": page}
+        async with session.get(SEARXNG_URL.rstrip("/") + "/search", params=params) as r:
+            r.raise_for_status()
+            data = await r.json()
+        
+        # Stop once a page adds nothing new; some instances repeat the last page
+        found = len(urls)
+        for result in data.get("results", []):
+            if result.get("url") and result["url"] not in urls:
+                urls.append(result["url"])
+                print(f"Found URL: {result['url']}")
+        if len(urls) == found:
+            break
+        page += 1
+    
+    return urls[:num_results]
+
+
+async def search(session, query, num_results=10, fallback_browser=False):
+    """Find result URLs through a configured search API, or the headless browser without one."""
+    if GOOGLE_API_KEY and GOOGLE_CSE_ID:
+        search_api = google_search_api
+    elif SEARXNG_URL:
+        search_api = searxng_search
+    else:
+        return await google_search(query, num_results)
+    
+    try:
+        return await search_api(session, query, num_results)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        if not fallback_browser:
+            raise RuntimeError(f"Search API request failed ({e}); pass --fallback-browser to search with the browser instead") from e
+        print(f"Search API request failed ({e}), falling back to the browser")
+        return await google_search(query, num_results)
 
 
 def is_valid_url(url):
     """Check if a URL is valid."""
-    try:
-        result = urlparse(url)
-        return all([result.scheme, result.netloc])
-    except:
-        return False
+    return bool(URL_RE.match(url))
 
 
+@functools.lru_cache(maxsize=4096)
 def normalize_url(base_url, url):
     """Convert relative URLs to absolute URLs."""
     if is_valid_url(url):
@@ -88,50 +374,145 @@ def normalize_url(base_url, url):
     return urljoin(base_url, url)
 
 
-def crawl_page(url):
+@functools.lru_cache(maxsize=None)
+def get_cache():
+    """Open the on-disk extraction cache on first use."""
+    return diskcache.Cache(CACHE_DIR, eviction_policy="least-recently-used")
+
+
+async def cache_get(key):
+    """Read a cache entry off the event loop, treating any cache error as a miss."""
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, lambda: get_cache().get(key))
+    except Exception as e:
+        print(f"Error reading cache: {e}")
+        return None
+
+
+async def cache_set(key, value):
+    """Write a cache entry off the event loop, reporting rather than raising cache errors."""
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, lambda: get_cache().set(key, value))
+    except Exception as e:
+        print(f"Error writing cache: {e}")
+
+
+async def fetch_validator(session, url):
+    """Return a URL's ETag or Last-Modified header from a HEAD request, or None."""
+    try:
+        async with session.head(url, allow_redirects=True, timeout=aiohttp.ClientTimeout(total=10)) as r:
+            if r.status >= 400:
+                return None
+            return r.headers.get("ETag") or r.headers.get("Last-Modified")
+    except Exception:
+        return None
+
+
+def cached_document(extract):
+    """Cache a document extractor's text under the URL and its current ETag/Last-Modified."""
+    @functools.wraps(extract)
+    async def wrapper(session, url):
+        # Without a validator there is no way to tell whether a cached copy is stale
+        validator = await fetch_validator(session, url)
+        if validator is None:
+            return await extract(session, url)
+        
+        key = ("document", url, validator)
+        text = await cache_get(key)
+        if text is None:
+            text = await extract(session, url)
+            if text:
+                await cache_set(key, text)
+        return text
+    return wrapper
+
+
+def parse_html(html):
+    """Return the visible text and link targets of an HTML page using Lexbor."""
+    tree = LexborHTMLParser(html)
+    if tree.body is None:
+        return parse_html_soup(html)
+    
+    for node in tree.css("script, style"):
+        node.decompose()
+    text = tree.body.text(separator=" ", strip=True)
+    hrefs = [a.attributes.get("href") for a in tree.css("a[href]")]
+    return text, [href for href in hrefs if href]
+
+
+def parse_html_soup(html):
+    """Return the visible text and link targets of an HTML page using BeautifulSoup."""
+    soup = BeautifulSoup(html, "lxml", parse_only=SOUP_STRAINER)
+    
+    # The strainer only filters top-level elements, so scripts inside <body> still need removing
+    for script in soup(["script", "style"]):
+        script.extract()
+    text = soup.get_text(separator=" ", strip=True)
+    hrefs = [a['href'] for a in soup.find_all('a', href=True)]
+    return text, hrefs
+
+
+async def crawl_page(session, url):
     """Extract text and downloadable links from a webpage."""
     print(f"Crawling {url}")
     text = ""
     downloadables = []
     
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36"
-        }
-        response = requests.get(url, timeout=15, headers=headers)
-        response.raise_for_status()
-        
-        content_type = response.headers.get('Content-Type', '').lower()
-        
-        # If the URL is a direct file
-        if any(ct in content_type for ct in ['application/pdf', 'application/vnd.openxmlformats-officedocument', 'application/msword']):
-            return "", [url]
+        async with session.get(url, timeout=PAGE_TIMEOUT) as response:
+            response.raise_for_status()
             
-        # If the URL is a direct text file
-        if 'text/plain' in content_type:
-            return response.text, []
-        
-        # Parse HTML content
-        soup = BeautifulSoup(response.text, "html.parser")
+            content_type = response.headers.get('Content-Type', '').lower()
+            
+            # If the URL is a direct file, drop the connection before its body is
+            # transferred; the document extractor downloads it separately
+            if any(ct in content_type for ct in ['application/pdf', 'application/vnd.openxmlformats-officedocument', 'application/msword']):
+                response.close()
+                return "", [url]
+            
+            # If the URL is a direct text file
+            if 'text/plain' in content_type:
+                return await response.text(errors="replace"), []
+            
+            # Read HTML only up to HTML_MAX_BYTES and drop the connection after that
+            buf = bytearray()
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                buf += chunk
+                if len(buf) >= HTML_MAX_BYTES:
+                    response.close()
+                    break
+            
+            # Without a header charset, use the byte order mark or <meta charset> of the page
+            data, bom_encoding = EncodingDetector.strip_byte_order_mark(bytes(buf[:HTML_MAX_BYTES]))
+            encoding = (response.charset or bom_encoding
+                        or EncodingDetector.find_declared_encoding(data, is_html=True) or "utf-8")
+            try:
+                body = data.decode(encoding, errors="replace")
+            except LookupError:
+                body = data.decode("utf-8", errors="replace")
         
-        # Extract text content
-        for script in soup(["script", "style"]):
-            script.extract()
-        text = soup.get_text(separator=" ", strip=True)
+        # Parse HTML content, falling back to BeautifulSoup for pages Lexbor rejects;
+        # a page whose HTML is unchanged since an earlier run is not parsed again
+        key = ("html", hashlib.sha256(body.encode("utf-8")).hexdigest())
+        cached = await cache_get(key)
+        if cached is not None:
+            text, hrefs = cached
+        else:
+            try:
+                text, hrefs = parse_html(body)
+            except Exception:
+                text, hrefs = parse_html_soup(body)
+            await cache_set(key, (text, hrefs))
         
         # Extract links to downloadable files
         links = []
-        for a in soup.find_all('a', href=True):
-            href = a['href']
+        for href in hrefs:
             full_url = normalize_url(url, href)
             if full_url and is_valid_url(full_url):
                 links.append(full_url)
         
         # Filter for downloadable files
-        downloadables = [
-            link for link in links 
-            if any(link.lower().endswith(ext) for ext in ['.pdf', '.txt', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx'])
-        ]
+        downloadables = [link for link in links if DOWNLOAD_RE.search(link)]
         
         return text, downloadables
         
@@ -140,166 +521,357 @@ def crawl_page(url):
         return "", []
 
 
-def extract_pdf_text(url):
-    """Download and extract text from a PDF file."""
-    print(f"Extracting PDF from {url}")
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36"
-        }
-        r = requests.get(url, stream=True, timeout=30, headers=headers)
+async def download_document(session, url, suffix):
+    """Stream a download and return its body as bytes, or a temp file path once it outgrows the spool limit."""
+    async with session.get(url, timeout=DOWNLOAD_TIMEOUT) as r:
         r.raise_for_status()
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as f:
-            f.write(r.content)
-            temp_path = f.name
+        buf = bytearray()
+        f = None
+        try:
+            if (r.content_length or 0) > DOWNLOAD_SPOOL_LIMIT:
+                f = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
             
+            async for chunk in r.content.iter_chunked(64 * 1024):
+                if f is None and len(buf) + len(chunk) > DOWNLOAD_SPOOL_LIMIT:
+                    f = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+                    f.write(buf)
+                    buf = None
+                if f is None:
+                    buf += chunk
+                else:
+                    f.write(chunk)
+        except Exception:
+            if f is not None:
+                f.close()
+                os.unlink(f.name)
+            raise
+        
+        if f is None:
+            return bytes(buf)
+        f.close()
+        return f.name
+
+
+def release_download(source):
+    """Remove the temp file behind a downloaded document, if it has one."""
+    if isinstance(source, str):
+        os.unlink(source)
+
+
+def open_pdf(source):
+    """Open a downloaded PDF from memory or from its temp file."""
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source, filetype="pdf")
+
+
+def open_zip(source):
+    """Open a downloaded OOXML document from memory or from its temp file."""
+    if isinstance(source, bytes):
+        return zipfile.ZipFile(io.BytesIO(source))
+    return zipfile.ZipFile(source)
+
+
+def extract_pdf_pages(source, start, stop):
+    """Extract text from a range of PDF pages using a private document handle."""
+    doc = open_pdf(source)
+    try:
+        return "".join(page.get_text("text", flags=PDF_TEXT_FLAGS) for page in doc.pages(start, stop))
+    finally:
+        doc.close()
+
+
+def pdf_worker_count(page_count):
+    """Return how many worker processes a PDF of page_count pages is split across."""
+    return min(PDF_WORKERS, page_count // PDF_PAGES_PER_WORKER)
+
+
+def extract_small_pdf(source):
+    """Return a PDF's page count, plus its text unless it is large enough to split."""
+    doc = open_pdf(source)
+    try:
+        page_count = doc.page_count
+        if pdf_worker_count(page_count) > 1:
+            return page_count, None
+        return page_count, "".join(page.get_text("text", flags=PDF_TEXT_FLAGS) for page in doc)
+    finally:
+        doc.close()
+
+
+def spool_to_file(data, suffix):
+    """Write an in-memory download to a temp file and return its path."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as f:
+        f.write(data)
+    return f.name
+
+
+async def extract_pdf_source(source):
+    """Extract text from a PDF in the worker processes, retrying once on a fresh pool."""
+    # One worker killed by a hostile PDF or the OOM killer breaks the whole pool;
+    # replace it so only this document can fail, not every later PDF of the run
+    for attempt in range(2):
+        pool = get_pdf_pool()
         try:
-            doc = fitz.open(temp_path)
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text()
-            doc.close()
+            return await extract_pdf_in_pool(pool, source)
+        except BrokenProcessPool:
+            discard_pdf_pool(pool)
+            if attempt:
+                raise
+
+
+async def extract_pdf_in_pool(pool, source):
+    """Extract text from a PDF in a worker pool, splitting large documents across it."""
+    loop = asyncio.get_running_loop()
+    
+    # Most PDFs are read whole by the same task that counts their pages
+    page_count, text = await loop.run_in_executor(pool, extract_small_pdf, source)
+    if text is not None:
+        return text
+    
+    # Workers get a temp file path rather than another copy of an in-memory body each
+    path = source
+    if isinstance(source, bytes):
+        path = await loop.run_in_executor(None, spool_to_file, source, ".pdf")
+    try:
+        # Each worker opens its own handle on the same download and takes a contiguous range
+        step = -(-page_count // pdf_worker_count(page_count))
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        texts = await asyncio.gather(*(
+            loop.run_in_executor(pool, extract_pdf_pages, path, start, stop) for start, stop in ranges
+        ))
+    finally:
+        if path is not source:
+            release_download(path)
+    return "".join(texts)
+
+
+@cached_document
+async def extract_pdf_text(session, url):
+    """Download and extract text from a PDF file."""
+    print(f"Extracting PDF from {url}")
+    try:
+        source = await download_document(session, url, ".pdf")
             
-            os.unlink(temp_path)  # Remove the temporary file
-            return text
+        try:
+            return await extract_pdf_source(source)
         except Exception as e:
             print(f"Error processing PDF file {url}: {e}")
-            os.unlink(temp_path)  # Ensure the temp file is removed
             return ""
+        finally:
+            release_download(source)
             
     except Exception as e:
         print(f"Error downloading PDF from {url}: {e}")
         return ""
 
 
-def extract_docx_text(url):
+def iter_xml_text(stream, text_tag, block_tag, breaks=None, break_parent=None):
+    """Yield the text nodes of an XML part, with a newline after each block."""
+    breaks = breaks or {}
+    parts = etree.iterparse(stream, events=("end",), tag=(text_tag, block_tag, *breaks),
+                            resolve_entities=False, no_network=True)
+    for _, elem in parts:
+        if elem.tag == text_tag:
+            if elem.text:
+                yield elem.text
+        elif elem.tag in breaks:
+            # Tab stop definitions share the tab tag but sit outside the runs
+            if elem.getparent().tag == break_parent:
+                yield breaks[elem.tag]
+        else:
+            yield "\n"
+            elem.clear()
+
+
+def read_shared_strings(zf):
+    """Load the shared string table of an XLSX workbook."""
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    
+    strings = []
+    with zf.open("xl/sharedStrings.xml") as part:
+        for _, si in etree.iterparse(part, events=("end",), tag=SHEET_NS + "si",
+                                     resolve_entities=False, no_network=True):
+            # Plain text is si/t and rich text si/r/t; skip the phonetic readings in si/rPh
+            texts = [child if child.tag == SHEET_NS + "t" else child.find(SHEET_NS + "t")
+                     for child in si if child.tag in (SHEET_NS + "t", SHEET_NS + "r")]
+            strings.append("".join(t.text or "" for t in texts if t is not None))
+            si.clear()
+    return strings
+
+
+def list_worksheets(zf):
+    """Return (name, part path) for each worksheet of an XLSX workbook in tab order."""
+    rels = etree.fromstring(zf.read("xl/_rels/workbook.xml.rels"), XML_PARSER)
+    targets = {rel.get("Id"): rel.get("Target", "") for rel in rels.iter(PKG_REL_NS + "Relationship")}
+    names = set(zf.namelist())
+    
+    sheets = []
+    workbook = etree.fromstring(zf.read("xl/workbook.xml"), XML_PARSER)
+    for sheet in workbook.iter(SHEET_NS + "sheet"):
+        target = targets.get(sheet.get(REL_NS + "id"), "")
+        path = target.lstrip("/") if target.startswith("/") else "xl/" + target
+        if path in names:
+            sheets.append((sheet.get("name"), path))
+    return sheets
+
+
+def column_index(cell_ref):
+    """Return the zero-based column of a cell reference such as "AB12"."""
+    index = 0
+    for letter in CELL_COLUMN_RE.match(cell_ref).group():
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+def iter_sheet_rows(stream, shared_strings):
+    """Yield the cell values of each row in an XLSX worksheet part."""
+    row = []
+    cells = etree.iterparse(stream, events=("end",), tag=(SHEET_NS + "c", SHEET_NS + "row"),
+                            resolve_entities=False, no_network=True)
+    for _, elem in cells:
+        if elem.tag == SHEET_NS + "row":
+            yield row
+            row = []
+            elem.clear()
+            continue
+        
+        # Empty cells are omitted from the XML, so pad up to this cell's column
+        cell_ref = elem.get("r")
+        if cell_ref:
+            row.extend([""] * (column_index(cell_ref) - len(row)))
+        
+        cell_type = elem.get("t")
+        if cell_type == "inlineStr":
+            row.append("".join(t.text or "" for t in elem.iter(SHEET_NS + "t")))
+            continue
+        
+        value = elem.findtext(SHEET_NS + "v")
+        if value is None:
+            row.append("")
+        elif cell_type == "s":
+            row.append(shared_strings[int(value)])
+        elif cell_type == "b":
+            row.append("True" if value == "1" else "False")
+        else:
+            row.append(value)
+
+
+def list_slides(zf):
+    """Return the slide part paths of a PPTX file in presentation order."""
+    rels = etree.fromstring(zf.read("ppt/_rels/presentation.xml.rels"), XML_PARSER)
+    targets = {rel.get("Id"): rel.get("Target", "") for rel in rels.iter(PKG_REL_NS + "Relationship")}
+    names = set(zf.namelist())
+    
+    slides = []
+    presentation = etree.fromstring(zf.read("ppt/presentation.xml"), XML_PARSER)
+    for slide in presentation.iter(PRESENTATION_NS + "sldId"):
+        target = targets.get(slide.get(REL_NS + "id"), "")
+        path = target.lstrip("/") if target.startswith("/") else "ppt/" + target
+        if path in names:
+            slides.append(path)
+    return slides
+
+
+@cached_document
+async def extract_docx_text(session, url):
     """Download and extract text from a DOCX file."""
     print(f"Extracting DOCX from {url}")
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36"
-        }
-        r = requests.get(url, stream=True, timeout=30, headers=headers)
-        r.raise_for_status()
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as f:
-            f.write(r.content)
-            temp_path = f.name
+        source = await download_document(session, url, ".docx")
             
         try:
-            doc = docx.Document(temp_path)
-            text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
+            # Paragraphs and table cells both live in word/document.xml
+            with open_zip(source) as zf, zf.open("word/document.xml") as part:
+                text = "".join(iter_xml_text(part, WORD_NS + "t", WORD_NS + "p", WORD_BREAKS, WORD_NS + "r"))
             
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        text += cell.text + " "
-                    text += "\n"
-            
-            os.unlink(temp_path)  # Remove the temporary file
             return text
         except Exception as e:
             print(f"Error processing DOCX file {url}: {e}")
-            os.unlink(temp_path)  # Ensure the temp file is removed
             return ""
+        finally:
+            release_download(source)
             
     except Exception as e:
         print(f"Error downloading DOCX from {url}: {e}")
         return ""
 
 
-def extract_xlsx_text(url):
+@cached_document
+async def extract_xlsx_text(session, url):
     """Download and extract text from an XLSX file."""
     print(f"Extracting XLSX from {url}")
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36"
-        }
-        r = requests.get(url, stream=True, timeout=30, headers=headers)
-        r.raise_for_status()
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as f:
-            f.write(r.content)
-            temp_path = f.name
+        source = await download_document(session, url, ".xlsx")
             
         try:
-            workbook = openpyxl.load_workbook(temp_path, data_only=True)
-            text = ""
-            
-            # Extract text from each worksheet
-            for sheet_name in workbook.sheetnames:
-                sheet = workbook[sheet_name]
-                text += f"Sheet: {sheet_name}\n"
+            parts = []
+            with open_zip(source) as zf:
+                shared_strings = read_shared_strings(zf)
                 
-                for row in sheet.iter_rows():
-                    row_text = " | ".join(str(cell.value) if cell.value is not None else "" for cell in row)
-                    if row_text.strip():
-                        text += row_text + "\n"
+                # Extract text from each worksheet
+                for sheet_name, sheet_path in list_worksheets(zf):
+                    parts.append(f"Sheet: {sheet_name}\n")
+                    
+                    with zf.open(sheet_path) as part:
+                        for row in iter_sheet_rows(part, shared_strings):
+                            row_text = " | ".join(row)
+                            if row_text.strip():
+                                parts.append(row_text + "\n")
+            text = "".join(parts)
             
-            os.unlink(temp_path)  # Remove the temporary file
             return text
         except Exception as e:
             print(f"Error processing XLSX file {url}: {e}")
-            os.unlink(temp_path)  # Ensure the temp file is removed
             return ""
+        finally:
+            release_download(source)
             
     except Exception as e:
         print(f"Error downloading XLSX from {url}: {e}")
         return ""
 
 
-def extract_pptx_text(url):
+@cached_document
+async def extract_pptx_text(session, url):
     """Download and extract text from a PPTX file."""
     print(f"Extracting PPTX from {url}")
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36"
-        }
-        r = requests.get(url, stream=True, timeout=30, headers=headers)
-        r.raise_for_status()
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pptx") as f:
-            f.write(r.content)
-            temp_path = f.name
+        source = await download_document(session, url, ".pptx")
             
         try:
-            presentation = Presentation(temp_path)
-            text = ""
-            
-            for i, slide in enumerate(presentation.slides):
-                text += f"Slide {i+1}:\n"
-                
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        text += shape.text + "\n"
-                
-                text += "\n"
+            parts = []
+            with open_zip(source) as zf:
+                for i, slide_path in enumerate(list_slides(zf)):
+                    parts.append(f"Slide {i+1}:\n")
+                    
+                    with zf.open(slide_path) as part:
+                        parts.extend(iter_xml_text(part, DRAWING_NS + "t", DRAWING_NS + "p", DRAWING_BREAKS, DRAWING_NS + "p"))
+                    
+                    parts.append("\n")
+            text = "".join(parts)
             
-            os.unlink(temp_path)  # Remove the temporary file
             return text
         except Exception as e:
             print(f"Error processing PPTX file {url}: {e}")
-            os.unlink(temp_path)  # Ensure the temp file is removed
             return ""
+        finally:
+            release_download(source)
             
     except Exception as e:
         print(f"Error downloading PPTX from {url}: {e}")
         return ""
 
 
-def extract_txt_text(url):
+@cached_document
+async def extract_txt_text(session, url):
     """Download and extract text from a text file."""
     print(f"Extracting TXT from {url}")
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36"
-        }
-        r = requests.get(url, timeout=15, headers=headers)
-        r.raise_for_status()
-        return r.text
+        async with session.get(url, timeout=PAGE_TIMEOUT) as r:
+            r.raise_for_status()
+            return await r.text(errors="replace")
     except Exception as e:
         print(f"Error extracting TXT from {url}: {e}")
         return ""
@@ -307,105 +879,153 @@ def extract_txt_text(url):
 
 def clean_text(text):
     """Clean and normalize extracted text."""
-    # Remove URLs
-    text = re.sub(r'https?://\S+', '', text)
-    
-    # Remove email addresses
-    text = re.sub(r'\S+@\S+\.\S+', '', text)
-    
-    # Convert None values to empty strings
-    text = re.sub(r'None', '', text)
-    
-    # Remove extra whitespace, newlines, tabs
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Remove very long words (likely garbage)
-    text = re.sub(r'\S{50,}', '', text)
-    
-    return text.strip()
+    # Remove URLs, email addresses, None values and very long words in one pass,
+    # then collapse whitespace, newlines and tabs
+    return WHITESPACE_RE.sub(' ', CLEAN_RE.sub('', text)).strip()
+
+
+def open_output(filename):
+    """Open an output file for writing, zstd-compressing it when the name ends in .zst."""
+    f = open(filename, "wb")
+    if filename.endswith(".zst"):
+        return zstandard.ZstdCompressor(level=3).stream_writer(f)
+    return f
 
 
 def save_json(data, filename="output.json"):
     """Save the results to a JSON file."""
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    with open_output(filename) as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
     print(f"Data saved to {filename}")
 
 
-async def extract_document_text(url):
+def append_ndjson(f, record):
+    """Append one record to an open newline-delimited JSON file."""
+    f.write(orjson.dumps(record))
+    f.write(b"\n")
+
+
+async def extract_document_text(session, url):
     """Extract text from document URLs based on file extension."""
-    url_lower = url.lower()
-    
-    if url_lower.endswith('.pdf'):
-        return extract_pdf_text(url)
-    elif url_lower.endswith('.txt'):
-        return extract_txt_text(url)
-    elif url_lower.endswith('.docx'):
-        return extract_docx_text(url)
-    elif url_lower.endswith('.xlsx'):
-        return extract_xlsx_text(url)
-    elif url_lower.endswith('.pptx'):
-        return extract_pptx_text(url)
-    elif url_lower.endswith('.doc'):
+    match = DOWNLOAD_RE.search(url)
+    extension = match.group(1).lower() if match else ""
+    
+    if extension == 'pdf':
+        return await extract_pdf_text(session, url)
+    elif extension == 'txt':
+        return await extract_txt_text(session, url)
+    elif extension == 'docx':
+        return await extract_docx_text(session, url)
+    elif extension == 'xlsx':
+        return await extract_xlsx_text(session, url)
+    elif extension == 'pptx':
+        return await extract_pptx_text(session, url)
+    elif extension == 'doc':
         print(f"Legacy DOC format not supported: {url}")
         return ""
-    elif url_lower.endswith('.xls'):
+    elif extension == 'xls':
         print(f"Legacy XLS format not supported: {url}")
         return ""
-    elif url_lower.endswith('.ppt'):
+    elif extension == 'ppt':
         print(f"Legacy PPT format not supported: {url}")
         return ""
     else:
         return ""
 
 
-async def process_url(url):
+async def process_url(session, url, document_tasks=None):
     """Process a single URL and extract all relevant information."""
-    page_text, downloadables = crawl_page(url)
+    if document_tasks is None:
+        document_tasks = {}
+    
+    page_text, downloadables = await crawl_page(session, url)
     
-    # Process downloadable documents
+    # Process downloadable documents; a document linked from several pages is
+    # extracted once and its text shared by every page that links it
     document_texts = []
     for doc_url in downloadables:
-        doc_text = await extract_document_text(doc_url)
+        task = document_tasks.get(doc_url)
+        if task is None:
+            task = asyncio.ensure_future(extract_document_text(session, doc_url))
+            document_tasks[doc_url] = task
+        
+        doc_text = await task
         if doc_text:
             document_texts.append(doc_text)
     
     # Combine all texts
-    combined_text = page_text
-    if document_texts:
-        combined_text += "\n" + "\n".join(document_texts)
+    combined_text = "\n".join([page_text] + document_texts)
     
     # Clean the combined text
     cleaned_text = clean_text(combined_text)
     
     return {
         "url": url,
-        "content": cleaned_text[:10000]  # Limit to 10k chars to prevent huge outputs
+        "content": cleaned_text
     }
 
 
-async def main(query, num_results=10, output_file="output.json"):
-    """Main function to run the scraper."""
+async def main(query, num_results=10, output_file="output.json", fallback_browser=False):
+    """Main function to run the scraper; the browser and PDF workers stay up for the next call (see run())."""
     print(f"Starting scraper for query: {query}")
     
-    # Get URLs from Google search
-    urls = await google_search(query, num_results)
-    print(f"Found {len(urls)} URLs")
+    # .ndjson/.jsonl output is written as each URL finishes, so interrupted
+    # runs keep what they scraped; .json output is written once at the end.
+    # Either may carry a trailing .zst to be compressed as it is written.
+    output_name = output_file[:-len(".zst")] if output_file.endswith(".zst") else output_file
+    ndjson_output = output_name.endswith((".ndjson", ".jsonl"))
     
-    # Process each URL
-    tasks = [process_url(url) for url in urls]
-    results = await asyncio.gather(*tasks)
+    # Search and process each URL over a shared connection pool
+    async with aiohttp.ClientSession(
+        headers=HEADERS,
+        timeout=DOWNLOAD_TIMEOUT,
+        connector=aiohttp.TCPConnector(limit=32, limit_per_host=4),
+    ) as session:
+        urls = list(dict.fromkeys(await search(session, query, num_results, fallback_browser)))
+        print(f"Found {len(urls)} URLs")
+        
+        # Bound concurrency overall and per host so origins are not hammered; the host
+        # slot is taken first so URLs queued behind a busy host hold no global slot
+        url_slots = asyncio.Semaphore(MAX_CONCURRENT_URLS)
+        host_slots = defaultdict(lambda: asyncio.Semaphore(MAX_CONCURRENT_URLS_PER_HOST))
+        document_tasks = {}
+        
+        async def process_url_limited(index, url):
+            async with host_slots[urlparse(url).netloc], url_slots:
+                return index, await process_url(session, url, document_tasks)
+        
+        tasks = [process_url_limited(i, url) for i, url in enumerate(urls)]
+        results = [None] * len(urls)
+        
+        with open_output(output_file) if ndjson_output else contextlib.nullcontext() as ndjson_file:
+            for task in asyncio.as_completed(tasks):
+                index, result = await task
+                results[index] = result
+                if ndjson_file and result["content"]:
+                    append_ndjson(ndjson_file, result)
     
-    # Remove empty results
+    # Remove empty results, keeping search result order
     results = [r for r in results if r["content"]]
     
     # Save results
-    save_json(results, output_file)
+    if ndjson_output:
+        print(f"Data saved to {output_file}")
+    else:
+        save_json(results, output_file)
     print(f"Scraping completed. Found content from {len(results)} pages.")
     
     return results
 
 
+async def run(query, num_results=10, output_file="output.json", fallback_browser=False):
+    """Entry point: run the scraper once and shut down the shared browser and PDF workers afterwards."""
+    try:
+        return await main(query, num_results, output_file, fallback_browser)
+    finally:
+        await close_browser()
+        shutdown_pdf_pool()
+
+
 if __name__ == "__main__":
     import sys
     import argparse
@@ -414,10 +1034,13 @@ if __name__ == "__main__":
     parser.add_argument("query", nargs="*", help="Search query")
     parser.add_argument("--results", type=int, default=10, help="Number of search results to process")
     parser.add_argument("--output", default="output.json", help="Output JSON file")
+    parser.add_argument("--fallback-browser", action="store_true", help="Scrape Google with a headless browser if the configured search API fails")
     
     args = parser.parse_args()
     
     query = " ".join(args.query) if args.query else "site:gov climate change report"
     
     print(f"Starting scraper with query: {query}")
-    asyncio.run(main(query, args.results, args.output)) 
\ No newline at end of file
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(run(query, args.results, args.output, args.fallback_browser)) 
\ No newline at end of file
@@ -6,6 +6,19 @@ from urllib.parse import urlparse, urljoin
 from bs4 import BeautifulSoup
 from playwright.async_api import async_playwright
 
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36"
+
+# One keep-alive session for every page fetch
+SESSION = requests.Session()
+SESSION.headers.update({
+    "User-Agent": USER_AGENT,
+    "Accept-Encoding": "gzip, deflate, br",
+})
+
+# URLs, email addresses, None values and very long words (likely garbage)
+CLEAN_RE = re.compile(r'https?://\S+|\S+@\S+\.\S+|None|\S{50,}')
+WHITESPACE_RE = re.compile(r'\s+')
+
 async def google_search(query, num_results=10):
     """Perform a Google search and return a list of result URLs."""
     urls = []
@@ -14,7 +27,7 @@ async def google_search(query, num_results=10):
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
         context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36"
+            user_agent=USER_AGENT
         )
         page = await context.new_page()
 
@@ -79,10 +92,7 @@ def crawl_page(url):
     """Extract text from a webpage."""
     print(f"Crawling {url}")
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36"
-        }
-        response = requests.get(url, timeout=15, headers=headers)
+        response = SESSION.get(url, timeout=15)
         response.raise_for_status()
         
         # Parse HTML content
@@ -101,22 +111,9 @@ def crawl_page(url):
 
 def clean_text(text):
     """Clean and normalize extracted text."""
-    # Remove URLs
-    text = re.sub(r'https?://\S+', '', text)
-    
-    # Remove email addresses
-    text = re.sub(r'\S+@\S+\.\S+', '', text)
-    
-    # Convert None values to empty strings
-    text = re.sub(r'None', '', text)
-    
-    # Remove extra whitespace, newlines, tabs
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Remove very long words (likely garbage)
-    text = re.sub(r'\S{50,}', '', text)
-    
-    return text.strip()
+    # Remove URLs, email addresses, None values and very long words in one pass,
+    # then collapse whitespace, newlines and tabs
+    return WHITESPACE_RE.sub(' ', CLEAN_RE.sub('', text)).strip()
 
 def save_json(data, filename="output.json"):
     """Save the results to a JSON file."""
@@ -9,6 +9,16 @@ import random
 import sys
 import socket
 
+# One keep-alive session for every page fetch
+SESSION = requests.Session()
+SESSION.headers.update({
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Referer": "https://www.google.com/"
+})
+
 def google_search_urls(query, num_results=20):
     """Scrape Google search results for a query using requests."""
     print(f"Searching the web for: {query}")
@@ -104,15 +114,8 @@ def crawl_page(url):
     """Extract text from a webpage."""
     print(f"Crawling {url}")
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
-            "Referer": "https://www.google.com/"
-        }
-        
         # Set a reasonable timeout
-        response = requests.get(url, timeout=20, headers=headers, allow_redirects=True)
+        response = SESSION.get(url, timeout=20, allow_redirects=True)
         response.raise_for_status()
         
         content_type = response.headers.get('Content-Type', '').lower()
@@ -147,8 +150,7 @@ def crawl_page(url):
         if not structured_content:
             content_divs = soup.find_all(['div', 'section'], class_=lambda c: c and any(x in str(c).lower() for x in ['content', 'main', 'article', 'body']))
             if content_divs:
-                for div in content_divs:
-                    structured_content += div.get_text(separator="\n", strip=True) + "\n\n"
+                structured_content = "".join(div.get_text(separator="\n", strip=True) + "\n\n" for div in content_divs)
         
         # If still no content, get all paragraphs
         if not structured_content: